@@ -1,149 +1,587 @@
+import argparse
+import cProfile
+import json
+import os
+import re
 import sys
+import time
+import tracemalloc
+from array import array
+from contextlib import contextmanager, nullcontext
 from constraint import Problem
+from almacen import AlmacenSoluciones
+from conteo import contador_soluciones, pagina_soluciones
+from portafolio import BacktrackingConfigurable, configuraciones_portafolio, resolver_portafolio
+from restricciones import tabla_tareas, RestriccionTablaTareas, RestriccionFranja, RestriccionRodaje
+from rutas import adyacentes_validos, alcance_rodaje, distancia_manhattan, coste_rodaje
 
-def leer_entrada(ruta_entrada):
+TIPOS_AVION = ("STD", "JMB")
+# Mayores valores que caben en las columnas de TablaAviones (array "q" e "i")
+ID_MAXIMO = 2 ** 63 - 1
+TAREAS_MAXIMO = 2 ** 31 - 1
+
+class ErrorEntrada(ValueError):
+    def __init__(self, numero_linea, mensaje):
+        super().__init__(f"línea {numero_linea}: {mensaje}")
+        self.numero_linea = numero_linea
+
+class TablaAviones:
+    # Aviones en columnas (arrays y bytearrays) en lugar de un diccionario por avión.
+    # definir_modelo_csp la recorre directamente; indexarla o iterarla devuelve los
+    # diccionarios de siempre para el resto del código.
+    def __init__(self):
+        self.ids = array("q")
+        self.tipos = bytearray()
+        self.restr = bytearray()
+        self.tareas_tipo_1 = array("i")
+        self.tareas_tipo_2 = array("i")
+
+    @classmethod
+    def desde_dicts(cls, aviones):
+        tabla = cls()
+        for avion in aviones:
+            tabla.agregar(avion["id"], avion["tipo"], avion["restr"], avion["tareas_tipo_1"], avion["tareas_tipo_2"])
+        return tabla
+
+    def agregar(self, id_avion, tipo, restr, tareas_tipo_1, tareas_tipo_2):
+        self.ids.append(id_avion)
+        self.tipos.append(TIPOS_AVION.index(tipo))
+        self.restr.append(restr)
+        self.tareas_tipo_1.append(tareas_tipo_1)
+        self.tareas_tipo_2.append(tareas_tipo_2)
+
+    def tipo(self, indice):
+        return TIPOS_AVION[self.tipos[indice]]
+
+    def es_jumbo(self):
+        jumbo = TIPOS_AVION.index("JMB")
+        return [codigo == jumbo for codigo in self.tipos]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, indice):
+        return {
+            "id": self.ids[indice],
+            "tipo": self.tipo(indice),
+            "restr": bool(self.restr[indice]),
+            "tareas_tipo_1": self.tareas_tipo_1[indice],
+            "tareas_tipo_2": self.tareas_tipo_2[indice],
+        }
+
+    def __iter__(self):
+        for indice in range(len(self)):
+            yield self[indice]
+
+PATRON_COORDENADA = re.compile(r"\(\s*(\d+)\s*,\s*(\d+)\s*\)")
+PATRON_AVION = re.compile(r"(\d+)\s*-\s*(JMB|STD)\s*-\s*([TF])\s*-\s*(\d+)\s*-\s*(\d+)")
+
+# Lee las líneas de aviones una a una y devuelve un generador de
+# (id, tipo, restr, tareas_tipo_1, tareas_tipo_2), validando el formato, que los ids no
+# se repitan y que las tareas quepan en las franjas horarias
+def leer_aviones(lineas, franjas_horarias):
+    ids = set()
+    for numero, linea in lineas:
+        linea = linea.strip()
+        if not linea:
+            continue
+        coincidencia = PATRON_AVION.fullmatch(linea)
+        if not coincidencia:
+            raise ErrorEntrada(numero, f"avión mal formado {linea!r}; se esperaba <id>-<JMB|STD>-<T|F>-<tareas tipo 1>-<tareas tipo 2>")
+        id_avion, tipo, restr, tareas_tipo_1, tareas_tipo_2 = coincidencia.groups()
+        id_avion, tareas_tipo_1, tareas_tipo_2 = int(id_avion), int(tareas_tipo_1), int(tareas_tipo_2)
+        if id_avion > ID_MAXIMO:
+            raise ErrorEntrada(numero, f"el id de avión {id_avion} es demasiado grande (máximo {ID_MAXIMO})")
+        if max(tareas_tipo_1, tareas_tipo_2) > TAREAS_MAXIMO:
+            raise ErrorEntrada(numero, f"el avión {id_avion} tiene demasiadas tareas (máximo {TAREAS_MAXIMO} por tipo)")
+        if id_avion in ids:
+            raise ErrorEntrada(numero, f"el avión {id_avion} está repetido")
+        if tareas_tipo_1 + tareas_tipo_2 > franjas_horarias:
+            raise ErrorEntrada(numero, f"el avión {id_avion} tiene {tareas_tipo_1 + tareas_tipo_2} tareas y solo hay {franjas_horarias} franjas")
+        ids.add(id_avion)
+        yield id_avion, tipo, restr == "T", tareas_tipo_1, tareas_tipo_2
+
+# Lee el archivo de entrada línea a línea. Con columnar=True los aviones se devuelven
+# en una TablaAviones; si no, como lista de diccionarios. Los errores de formato se
+# lanzan como ErrorEntrada con el número de línea.
+def leer_entrada(ruta_entrada, columnar=False):
     with open(ruta_entrada, "r") as archivo:
-        lineas = archivo.readlines()
-
-    franjas_horarias = int(lineas[0].split(":")[1].strip())
-    filas, columnas = map(int, lineas[1].split("x"))
-
-    def parse_coordenadas(linea):
-        coordenadas = linea.split(":")[1].strip()
-        return [tuple(map(int, coord.strip("()").split(","))) for coord in coordenadas.replace(" ", "").split(")(")]
-
-    talleres_std = parse_coordenadas(lineas[2])
-    talleres_spc = parse_coordenadas(lineas[3])
-    parkings = parse_coordenadas(lineas[4])
-
-    aviones = []
-    for linea in lineas[5:]:
-        partes = linea.strip().split("-")
-        aviones.append({
-            "id": int(partes[0]),
-            "tipo": partes[1],
-            "restr": partes[2] == "T",
-            "tareas_tipo_1": int(partes[3]),
-            "tareas_tipo_2": int(partes[4]),
-        })
+        lineas = enumerate(archivo, start=1)
+        ultima = 0
+
+        def cabecera(descripcion):
+            nonlocal ultima
+            for numero, linea in lineas:
+                ultima = numero
+                if linea.strip():
+                    return numero, linea.strip()
+            raise ErrorEntrada(ultima + 1, f"falta {descripcion}")
+
+        numero, linea = cabecera("la línea de franjas horarias")
+        coincidencia = re.fullmatch(r"Franjas\s*:\s*(\d+)", linea)
+        if not coincidencia:
+            raise ErrorEntrada(numero, f"se esperaba 'Franjas: <número>' y se leyó {linea!r}")
+        franjas_horarias = int(coincidencia.group(1))
+
+        numero, linea = cabecera("el tamaño del mapa")
+        coincidencia = re.fullmatch(r"(\d+)\s*x\s*(\d+)", linea)
+        if not coincidencia or int(coincidencia.group(1)) == 0 or int(coincidencia.group(2)) == 0:
+            raise ErrorEntrada(numero, f"se esperaba '<filas>x<columnas>' con valores positivos y se leyó {linea!r}")
+        filas, columnas = int(coincidencia.group(1)), int(coincidencia.group(2))
+
+        ocupadas = {}
+
+        def parse_coordenadas(etiqueta):
+            numero, linea = cabecera(f"la línea {etiqueta}")
+            coincidencia = re.fullmatch(etiqueta + r"\s*:(.*)", linea)
+            if not coincidencia:
+                raise ErrorEntrada(numero, f"se esperaba '{etiqueta}: (x,y) ...' y se leyó {linea!r}")
+            if PATRON_COORDENADA.sub("", coincidencia.group(1)).strip():
+                raise ErrorEntrada(numero, f"coordenadas mal formadas en la línea {etiqueta}")
+            coordenadas = []
+            for x, y in PATRON_COORDENADA.findall(coincidencia.group(1)):
+                x, y = int(x), int(y)
+                if not (0 <= x < filas and 0 <= y < columnas):
+                    raise ErrorEntrada(numero, f"la coordenada ({x},{y}) está fuera del mapa de {filas}x{columnas}")
+                if (x, y) in ocupadas:
+                    raise ErrorEntrada(numero, f"la coordenada ({x},{y}) ya está declarada en {ocupadas[(x, y)]}")
+                ocupadas[(x, y)] = etiqueta
+                coordenadas.append((x, y))
+            return coordenadas
+
+        talleres_std = parse_coordenadas("STD")
+        talleres_spc = parse_coordenadas("SPC")
+        parkings = parse_coordenadas("PRK")
+
+        if columnar:
+            aviones = TablaAviones()
+            for avion in leer_aviones(lineas, franjas_horarias):
+                aviones.agregar(*avion)
+        else:
+            aviones = [
+                {"id": id_avion, "tipo": tipo, "restr": restr, "tareas_tipo_1": tareas_tipo_1, "tareas_tipo_2": tareas_tipo_2}
+                for id_avion, tipo, restr, tareas_tipo_1, tareas_tipo_2 in leer_aviones(lineas, franjas_horarias)
+            ]
 
     return franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones
 
+TIPOS_CELDA = ("VACIO", "STD", "SPC", "PRK")
+
+class Mapa:
+    # Mapa del aeropuerto en un bytearray con un código de TIPOS_CELDA por celda
+    # (x * columnas + y). Las listas de celdas por tipo y la vecindad de las celdas útiles
+    # se calculan una sola vez. mapa[x][y] e iterar por filas siguen devolviendo los
+    # nombres de los tipos.
+    def __init__(self, filas, columnas):
+        self.filas = filas
+        self.columnas = columnas
+        self.celdas = bytearray(filas * columnas)
+        self._indices = None
+        self._vecindad = None
+
+    def marcar(self, x, y, tipo):
+        self.celdas[x * self.columnas + y] = TIPOS_CELDA.index(tipo)
+        self._indices = None
+        self._vecindad = None
+
+    def tipo(self, x, y):
+        return TIPOS_CELDA[self.celdas[x * self.columnas + y]]
+
+    def __len__(self):
+        return self.filas
+
+    def __getitem__(self, x):
+        if not 0 <= x < self.filas:
+            raise IndexError("fila fuera del mapa")
+        inicio = x * self.columnas
+        return [TIPOS_CELDA[codigo] for codigo in self.celdas[inicio:inicio + self.columnas]]
+
+    def __iter__(self):
+        for x in range(self.filas):
+            yield self[x]
+
+    def indices(self, tipo):
+        if self._indices is None:
+            self._indices = {}
+            for codigo, nombre in enumerate(TIPOS_CELDA):
+                indices = array("I")
+                celda = self.celdas.find(codigo)
+                while celda != -1:
+                    indices.append(celda)
+                    celda = self.celdas.find(codigo, celda + 1)
+                self._indices[nombre] = indices
+        return self._indices[tipo]
+
+    def posiciones(self, *tipos):
+        # Posiciones (x, y) de las celdas de los tipos dados, por filas
+        return [divmod(celda, self.columnas) for celda in sorted(c for tipo in tipos for c in self.indices(tipo))]
+
+    def vecindad(self):
+        # Índice compacto de cada celda útil (-1 para VACIO), los índices compactos de sus
+        # vecinas útiles y su número total de vecinas dentro del mapa
+        if self._vecindad is None:
+            utiles = self.posiciones("STD", "SPC", "PRK")
+            compacto = array("i", [-1]) * len(self.celdas)
+            for idx, (x, y) in enumerate(utiles):
+                compacto[x * self.columnas + y] = idx
+            vecinos = []
+            grados = array("i")
+            for pos in utiles:
+                adyacentes = adyacentes_validos(pos, self.filas, self.columnas)
+                vecinos.append(tuple(compacto[nx * self.columnas + ny] for nx, ny in adyacentes if compacto[nx * self.columnas + ny] >= 0))
+                grados.append(len(adyacentes))
+            self._vecindad = compacto, tuple(vecinos), grados
+        return self._vecindad
+
 def crear_mapa(filas, columnas, talleres_std, talleres_spc, parkings):
-    mapa = [["VACIO" for _ in range(columnas)] for _ in range(filas)]
+    mapa = Mapa(filas, columnas)
 
     for x, y in talleres_std:
-        mapa[x][y] = "STD"
+        mapa.marcar(x, y, "STD")
     for x, y in talleres_spc:
-        mapa[x][y] = "SPC"
+        mapa.marcar(x, y, "SPC")
     for x, y in parkings:
-        mapa[x][y] = "PRK"
+        mapa.marcar(x, y, "PRK")
 
     return mapa
 
 def imprimir_mapa(mapa):
     print("\nMapa del aeropuerto:")
+    escribir = sys.stdout.write
     for fila in mapa:
-        print(" ".join(fila))
-
-def adyacentes_validos(pos, filas, columnas):
-    x, y = pos
-    adyacentes = [(x-1, y), (x+1, y), (x, y-1), (x, y+1)]
-    return [(nx, ny) for nx, ny in adyacentes if 0 <= nx < filas and 0 <= ny < columnas]
+        escribir(" ".join(fila) + "\n")
 
-def definir_modelo_csp(franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones, mapa):
+# Con primera_franja y franjas_posteriores se modela una ventana del horizonte rodante:
+# las variables se numeran desde primera_franja y las tareas pendientes pueden quedar para
+# las franjas posteriores. posiciones_previas (id -> posición en la franja anterior a la
+# ventana) se usa con max_rodaje para enlazar con lo ya fijado. En todos los movimientos,
+# dentro de la ventana o desde posiciones_previas, un avión no puede atravesar las celdas
+# que ocupan los demás en la franja de la que sale (ver rutas).
+def definir_modelo_csp(franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones, mapa, max_rodaje=None, primera_franja=0, franjas_posteriores=0, posiciones_previas=None):
     problem = Problem()
 
-    # Definir variables y dominios
-    for avion in aviones:
-        tareas_tipo_2 = avion["tareas_tipo_2"]
-        tareas_tipo_1 = avion["tareas_tipo_1"]
-
-        for franja in range(franjas_horarias):
-            variable = f"Avion_{avion['id']}_t{franja}"
-            if tareas_tipo_2 > 0:
-                problem.addVariable(variable, [{"posicion": (x, y), "tarea": "T2", "tipo": avion["tipo"]} for x in range(filas) for y in range(columnas) if mapa[x][y] == "SPC"])
-                tareas_tipo_2 -= 1
-            elif tareas_tipo_1 > 0:
-                problem.addVariable(variable, [{"posicion": (x, y), "tarea": "T1", "tipo": avion["tipo"]} for x in range(filas) for y in range(columnas) if mapa[x][y] in ["STD", "SPC"]])
-                tareas_tipo_1 -= 1
-            else:
-                problem.addVariable(variable, [{"posicion": (x, y), "tarea": "PRK", "tipo": avion["tipo"]} for x in range(filas) for y in range(columnas) if mapa[x][y] == "PRK"])
-
-    # Restricción: No permitir JMB+JMB y limitar a 2 aviones estándar
-    def restriccion_capacidad(*valores):
-        posiciones = {}
-        for valor in valores:
-            pos = valor["posicion"]
-            tipo = valor["tipo"]
-            if pos not in posiciones:
-                posiciones[pos] = {"jumbos": 0, "estandar": 0}
-            if tipo == "JMB":
-                posiciones[pos]["jumbos"] += 1
-            else:
-                posiciones[pos]["estandar"] += 1
-
-            # Restricciones combinadas: JMB+JMB prohibido, máximo 2 aviones estándar
-            if posiciones[pos]["jumbos"] > 1:
-                return False
-            if posiciones[pos]["jumbos"] > 0 and posiciones[pos]["estandar"] > 1:
-                return False
-            if posiciones[pos]["estandar"] > 2:
-                return False
-        return True
-
-    # Restricción: Un adyacente debe estar vacío y evitar JMB en adyacentes
-    def restriccion_adyacentes(*valores):
-        posiciones = [v["posicion"] for v in valores]
-        for i, valor in enumerate(valores):
-            pos = valor["posicion"]
-            tipo = valor["tipo"]
-            adyacentes = adyacentes_validos(pos, filas, columnas)
-
-            # Verificar al menos un adyacente vacío
-            if all(adj in posiciones for adj in adyacentes):
-                return False
-
-            # Prohibir dos JMB en adyacentes
-            if tipo == "JMB":
-                for j, otro_valor in enumerate(valores):
-                    if i != j and otro_valor["tipo"] == "JMB" and otro_valor["posicion"] in adyacentes:
-                        return False
-        return True
-
-    # Aplicar restricciones
-    for t in range(franjas_horarias):
-        variables = [f"Avion_{avion['id']}_t{t}" for avion in aviones]
-        problem.addConstraint(restriccion_capacidad, variables)
-        problem.addConstraint(restriccion_adyacentes, variables)
+    celdas = {
+        "T2": mapa.posiciones("SPC"),
+        "T1": mapa.posiciones("STD", "SPC"),
+        "PRK": mapa.posiciones("PRK"),
+    }
+
+    # Los aviones se recorren por columnas; una lista de diccionarios se convierte antes
+    if not isinstance(aviones, TablaAviones):
+        aviones = TablaAviones.desde_dicts(aviones)
+    ids = aviones.ids
+
+    # Definir variables y dominios: cualquier tarea en cualquier franja
+    for indice, id_avion in enumerate(ids):
+        tipo = aviones.tipo(indice)
+        variables = [f"Avion_{id_avion}_t{primera_franja + franja}" for franja in range(franjas_horarias)]
+        for variable in variables:
+            problem.addVariable(variable, [{"posicion": pos, "tarea": tarea, "tipo": tipo} for tarea in ["T2", "T1", "PRK"] for pos in celdas[tarea]])
+
+        # Restricción: número y orden de las tareas del avión. Al preprocesar quita de cada
+        # franja las tareas que ninguna línea temporal admite
+        tabla = tabla_tareas(franjas_horarias, aviones.tareas_tipo_1[indice], aviones.tareas_tipo_2[indice], bool(aviones.restr[indice]), franjas_posteriores)
+        problem.addConstraint(RestriccionTablaTareas(tabla), variables)
+
+    # Restricciones por franja: capacidad de cada posición y maniobrabilidad
+    vecindad = mapa.vecindad()
+    es_jumbo = aviones.es_jumbo()
+    for t in range(primera_franja, primera_franja + franjas_horarias):
+        variables = [f"Avion_{id_avion}_t{t}" for id_avion in ids]
+        problem.addConstraint(RestriccionFranja(columnas, vecindad, es_jumbo), variables)
+
+    # Restricción opcional: distancia de rodaje máxima entre franjas consecutivas. La
+    # restricción binaria de cada avión poda pronto con la distancia Manhattan (cota inferior);
+    # RestriccionRodaje comprueba cada transición entre los demás aviones con un solo
+    # conjunto de obstáculos por franja. Como solo decide cuando la franja de salida está
+    # completa, la búsqueda asigna las franjas en orden cronológico.
+    if max_rodaje is not None:
+        problem.setSolver(BacktrackingConfigurable("franja"))
+
+        def restriccion_rodaje(actual, siguiente):
+            return distancia_manhattan(actual["posicion"], siguiente["posicion"]) <= max_rodaje
+
+        for id_avion in ids:
+            for t in range(primera_franja, primera_franja + franjas_horarias - 1):
+                problem.addConstraint(restriccion_rodaje, [f"Avion_{id_avion}_t{t}", f"Avion_{id_avion}_t{t + 1}"])
+        for t in range(primera_franja, primera_franja + franjas_horarias - 1):
+            variables = [f"Avion_{id_avion}_t{t}" for id_avion in ids] + [f"Avion_{id_avion}_t{t + 1}" for id_avion in ids]
+            problem.addConstraint(RestriccionRodaje(filas, columnas, max_rodaje), variables)
+
+        if posiciones_previas:
+            # Desde las posiciones ya fijadas, rodando entre los demás aviones fijados
+            obstaculos = frozenset(posiciones_previas.values())
+            for id_avion in ids:
+                if id_avion in posiciones_previas:
+                    alcance = alcance_rodaje(posiciones_previas[id_avion], filas, columnas, obstaculos, max_rodaje)
+                    problem.addConstraint(lambda valor, alcance=alcance: valor["posicion"] in alcance, [f"Avion_{id_avion}_t{primera_franja}"])
 
     return problem
 
-def resolver_y_mostrar(problem):
-    soluciones = list(problem.getSolutions())
-    if not soluciones:
+# Horizonte rodante: resuelve ventanas de `ventana` franjas, fija las `avance` primeras y
+# continúa con las tareas que le quedan a cada avión. Devuelve un generador de
+# (franja, asignación de la franja) en orden; si una ventana no tiene solución, se detiene
+# antes de esa franja. Solo se mantiene en memoria el modelo de la ventana actual.
+# Lanza ValueError al llamarla (no al empezar a iterar) si ventana o avance no son válidos.
+def resolver_horizonte_rodante(franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones, mapa, ventana, avance, max_rodaje=None):
+    if ventana < 1:
+        raise ValueError("la ventana debe ser de al menos 1 franja")
+    if not 1 <= avance <= ventana:
+        raise ValueError("el avance debe estar entre 1 y la ventana")
+    return _ventanas_horizonte(franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones, mapa, ventana, avance, max_rodaje)
+
+def _ventanas_horizonte(franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones, mapa, ventana, avance, max_rodaje):
+    pendientes = [dict(avion) for avion in aviones]
+    posiciones_previas = None
+    inicio = 0
+    while inicio < franjas_horarias:
+        franjas_ventana = min(ventana, franjas_horarias - inicio)
+        franjas_posteriores = franjas_horarias - inicio - franjas_ventana
+        fijadas = franjas_ventana if franjas_posteriores == 0 else min(avance, franjas_ventana)
+
+        problem = definir_modelo_csp(franjas_ventana, filas, columnas, talleres_std, talleres_spc, parkings, pendientes, mapa,
+                                     max_rodaje, inicio, franjas_posteriores, posiciones_previas)
+        solucion = problem.getSolution()
+        if solucion is None:
+            return
+
+        for t in range(inicio, inicio + fijadas):
+            asignacion = {}
+            for avion in pendientes:
+                variable = f"Avion_{avion['id']}_t{t}"
+                valor = solucion[variable]
+                if valor["tarea"] == "T2":
+                    avion["tareas_tipo_2"] -= 1
+                elif valor["tarea"] == "T1":
+                    avion["tareas_tipo_1"] -= 1
+                asignacion[variable] = valor
+            yield t, asignacion
+
+        posiciones_previas = {avion["id"]: solucion[f"Avion_{avion['id']}_t{inicio + fijadas - 1}"]["posicion"] for avion in pendientes}
+        inicio += fijadas
+
+def resolver_y_mostrar_por_ventanas(franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones, mapa, ventana, avance, max_rodaje=None):
+    franjas_fijadas = 0
+    for franja, asignacion in resolver_horizonte_rodante(franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones, mapa, ventana, avance, max_rodaje):
+        print(f"\nFranja {franja}:")
+        for variable, valor in sorted(asignacion.items()):
+            print(f"{variable} -> {valor}")
+        sys.stdout.flush()
+        franjas_fijadas += 1
+    if franjas_fijadas < franjas_horarias:
+        print(f"\nNo se encontró solución a partir de la franja {franjas_fijadas}.")
+
+def resolver_y_mostrar_portafolio(n, franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones, mapa, max_rodaje=None):
+    configuraciones = configuraciones_portafolio(n)
+    argumentos_modelo = (franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones, mapa, max_rodaje)
+    ganadora, solucion, segundos, canceladas = resolver_portafolio(configuraciones, definir_modelo_csp, argumentos_modelo)
+    if ganadora is None:
+        print("Todas las búsquedas del portafolio fallaron.")
+        return
+    descripcion = ", ".join(f"{clave}={valor}" for clave, valor in ganadora.items())
+    print(f"Configuración ganadora: {descripcion} ({segundos:.3f} s); {canceladas} búsquedas canceladas.")
+    if solucion is None:
         print("No se encontraron soluciones.")
     else:
-        print(f"Se encontraron {len(soluciones)} soluciones.")
-        for idx, solucion in enumerate(soluciones):
-            print(f"\nSolución {idx + 1}:")
+        print("\nSolución:")
+        for variable, valor in sorted(solucion.items()):
+            print(f"{variable} -> {valor}")
+
+def mostrar_muestra(contador, k, semilla=None, perfilador=None):
+    with fase(perfilador, "muestreo"):
+        total = contador.contar()
+        muestra = list(contador.muestrear(k, semilla))
+
+    with fase(perfilador, "impresion"):
+        if not total:
+            print("No se encontraron soluciones.")
+            return
+        print(f"Muestra uniforme de {k} de las {total} soluciones (semilla {semilla}).")
+        for idx, (indice, solucion) in enumerate(muestra):
+            print(f"\nMuestra {idx + 1} (solución {indice + 1}):")
+            for variable, valor in sorted(solucion.items()):
+                print(f"{variable} -> {valor}")
+
+def mostrar_pagina(contador, tamano, desde=0, cursor=None, perfilador=None):
+    with fase(perfilador, "paginacion"):
+        inicio, soluciones, siguiente = pagina_soluciones(contador, tamano, desde, cursor)
+        total = contador.contar()
+
+    with fase(perfilador, "impresion"):
+        if not total:
+            print("No se encontraron soluciones.")
+            return
+        if not soluciones:
+            print(f"No hay soluciones a partir de la {inicio + 1}; hay {total}.")
+            return
+        print(f"Soluciones {inicio + 1}-{inicio + len(soluciones)} de {total}.")
+        for idx, solucion in enumerate(soluciones, start=inicio + 1):
+            print(f"\nSolución {idx}:")
             for variable, valor in sorted(solucion.items()):
                 print(f"{variable} -> {valor}")
+        if siguiente:
+            print(f"\nCursor de la página siguiente: {siguiente}")
+
+class Perfilador:
+    # Registra por fase el tiempo real, el tiempo de CPU y el pico de memoria de tracemalloc,
+    # y opcionalmente vuelca un fichero de cProfile por fase en dir_pstats
+    def __init__(self, dir_pstats=None):
+        self.dir_pstats = dir_pstats
+        self.fases = []
+
+    @contextmanager
+    def fase(self, nombre):
+        perfil = cProfile.Profile() if self.dir_pstats else None
+        tracemalloc.reset_peak()
+        inicio_real = time.perf_counter()
+        inicio_cpu = time.process_time()
+        if perfil:
+            perfil.enable()
+        try:
+            yield
+        finally:
+            if perfil:
+                perfil.disable()
+            registro = {
+                "fase": nombre,
+                "tiempo_real_s": time.perf_counter() - inicio_real,
+                "tiempo_cpu_s": time.process_time() - inicio_cpu,
+                "pico_memoria_bytes": tracemalloc.get_traced_memory()[1],
+            }
+            if perfil:
+                registro["pstats"] = os.path.join(self.dir_pstats, f"{nombre}.pstats")
+                perfil.dump_stats(registro["pstats"])
+            self.fases.append(registro)
+
+    def informe(self):
+        return {
+            "fases": self.fases,
+            "tiempo_real_s": sum(f["tiempo_real_s"] for f in self.fases),
+            "tiempo_cpu_s": sum(f["tiempo_cpu_s"] for f in self.fases),
+            "pico_memoria_bytes": max((f["pico_memoria_bytes"] for f in self.fases), default=0),
+        }
+
+def fase(perfilador, nombre):
+    return perfilador.fase(nombre) if perfilador else nullcontext()
+
+def resolver_y_mostrar(problem, filas, columnas, perfilador=None, presupuesto_bytes=64 * 1024 * 1024, mostrar_coste=False):
+    with AlmacenSoluciones(filas, columnas, presupuesto_bytes) as soluciones:
+        with fase(perfilador, "busqueda"):
+            for solucion in problem.getSolutionIter():
+                soluciones.agregar(solucion)
+
+        with fase(perfilador, "impresion"):
+            if not len(soluciones):
+                print("No se encontraron soluciones.")
+            else:
+                print(f"Se encontraron {len(soluciones)} soluciones.")
+                for idx, solucion in enumerate(soluciones):
+                    print(f"\nSolución {idx + 1}:")
+                    for variable, valor in solucion.items():
+                        print(f"{variable} -> {valor}")
+                    if mostrar_coste:
+                        print(f"Coste de rodaje: {coste_rodaje(solucion, filas, columnas)}")
 
 def main():
-    if len(sys.argv) != 2:
-        print("Uso: python CSPMaintenance.py <ruta_archivo_entrada>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Planificación del mantenimiento de aviones como CSP")
+    parser.add_argument("ruta_entrada", help="ruta del archivo de entrada")
+    parser.add_argument("--memoria-soluciones", metavar="BYTES", type=int, default=64 * 1024 * 1024, help="memoria máxima para guardar soluciones antes de volcarlas a disco")
+    parser.add_argument("--max-rodaje", metavar="D", type=int, help="distancia de rodaje máxima de un avión entre franjas consecutivas; muestra el coste de rodaje de cada solución")
+    parser.add_argument("--ventana", metavar="W", type=int, help="resuelve por horizonte rodante con ventanas de W franjas, mostrando una planificación")
+    parser.add_argument("--avance", metavar="K", type=int, help="franjas que se fijan en cada ventana del horizonte rodante (por defecto, la mitad de la ventana)")
+    parser.add_argument("--portafolio", metavar="N", type=int, help="lanza N búsquedas con distintas heurísticas en paralelo y muestra la primera solución")
+    parser.add_argument("--sample", metavar="K", type=int, help="muestra K soluciones tomadas de forma uniforme sin enumerarlas todas")
+    parser.add_argument("--seed", metavar="S", type=int, help="semilla del muestreo de --sample")
+    parser.add_argument("--desde", metavar="N", type=int, help="muestra una página de soluciones saltando las N primeras sin enumerarlas")
+    parser.add_argument("--limite", metavar="M", type=int, help="tamaño de la página de soluciones (por defecto, 50)")
+    parser.add_argument("--cursor", metavar="C", help="continúa la paginación desde el cursor que mostró la página anterior")
+    parser.add_argument("--cache-conteo", metavar="DIR", help="directorio donde guardar y reutilizar los recuentos de --sample y la paginación entre ejecuciones")
+    parser.add_argument("--profile", action="store_true", help="mide tiempo real, tiempo de CPU y pico de memoria de cada fase y los emite como JSON")
+    parser.add_argument("--profile-salida", metavar="RUTA", help="fichero donde escribir el JSON del perfil (por defecto, la salida de error)")
+    parser.add_argument("--profile-pstats", metavar="DIR", help="directorio donde volcar un fichero de cProfile por fase")
+    args = parser.parse_args()
+    if args.ventana is not None and args.ventana < 1:
+        parser.error("--ventana debe ser al menos 1")
+    if args.portafolio is not None and args.portafolio < 1:
+        parser.error("--portafolio debe ser al menos 1")
+    paginar = any(opcion is not None for opcion in (args.desde, args.limite, args.cursor))
+    if sum(opcion is not None for opcion in (args.portafolio, args.ventana, args.sample)) + paginar > 1:
+        parser.error("--portafolio, --ventana, --sample y la paginación no se pueden combinar")
+    if paginar and args.max_rodaje is not None:
+        parser.error("la paginación no admite --max-rodaje")
+    if (args.desde is not None and args.desde < 0) or (args.limite is not None and args.limite < 1):
+        parser.error("--desde no puede ser negativo y --limite debe ser al menos 1")
+    if args.sample is not None and args.sample < 0:
+        parser.error("--sample no puede ser negativo")
+    if args.sample is not None and args.max_rodaje is not None:
+        parser.error("--sample no admite --max-rodaje")
+    if args.avance is not None and not 1 <= args.avance <= (args.ventana or 0):
+        parser.error("--avance debe estar entre 1 y --ventana")
+    if args.cache_conteo and not (paginar or args.sample is not None):
+        parser.error("--cache-conteo solo se usa con --sample o la paginación")
+    if (args.profile_salida or args.profile_pstats) and not args.profile:
+        parser.error("--profile-salida y --profile-pstats requieren --profile")
+
+    perfilador = None
+    if args.profile:
+        if args.profile_pstats:
+            os.makedirs(args.profile_pstats, exist_ok=True)
+        perfilador = Perfilador(args.profile_pstats)
+        tracemalloc.start()
 
-    ruta_entrada = sys.argv[1]
-    franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones = leer_entrada(ruta_entrada)
+    # El informe se emite también si la ejecución termina con sys.exit (entrada o cursor no válidos)
+    try:
+        with fase(perfilador, "leer_entrada"):
+            try:
+                franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones = leer_entrada(args.ruta_entrada, columnar=True)
+            except (ErrorEntrada, OSError) as error:
+                print(f"Error en la entrada: {error}")
+                sys.exit(1)
 
-    mapa = crear_mapa(filas, columnas, talleres_std, talleres_spc, parkings)
-    imprimir_mapa(mapa)
+        with fase(perfilador, "crear_mapa"):
+            mapa = crear_mapa(filas, columnas, talleres_std, talleres_spc, parkings)
+        with fase(perfilador, "imprimir_mapa"):
+            imprimir_mapa(mapa)
 
-    problem = definir_modelo_csp(franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones, mapa)
-    print("\nResolviendo el CSP...")
-    resolver_y_mostrar(problem)
+        if paginar:
+            print("\nPaginando las soluciones del CSP...")
+            with fase(perfilador, "conteo"):
+                contador = contador_soluciones(franjas_horarias, filas, columnas, aviones, mapa, args.cache_conteo)
+                contador.contar()
+            try:
+                mostrar_pagina(contador, args.limite or 50, args.desde or 0, args.cursor, perfilador)
+            except ValueError as error:
+                print(f"Error: {error}")
+                sys.exit(1)
+        elif args.sample is not None:
+            print("\nMuestreando el CSP...")
+            with fase(perfilador, "conteo"):
+                contador = contador_soluciones(franjas_horarias, filas, columnas, aviones, mapa, args.cache_conteo)
+                contador.contar()
+            mostrar_muestra(contador, args.sample, args.seed, perfilador)
+        elif args.portafolio is not None:
+            print(f"\nResolviendo el CSP con un portafolio de {args.portafolio} búsquedas...")
+            with fase(perfilador, "portafolio"):
+                resolver_y_mostrar_portafolio(args.portafolio, franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones, mapa, args.max_rodaje)
+        elif args.ventana is not None:
+            avance = args.avance or max(1, args.ventana // 2)
+            print(f"\nResolviendo el CSP por horizonte rodante (ventana {args.ventana}, avance {avance})...")
+            with fase(perfilador, "horizonte_rodante"):
+                resolver_y_mostrar_por_ventanas(franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones, mapa, args.ventana, avance, args.max_rodaje)
+        else:
+            with fase(perfilador, "definir_modelo_csp"):
+                problem = definir_modelo_csp(franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones, mapa, args.max_rodaje)
+            print("\nResolviendo el CSP...")
+            resolver_y_mostrar(problem, filas, columnas, perfilador, args.memoria_soluciones, args.max_rodaje is not None)
+    finally:
+        if perfilador:
+            tracemalloc.stop()
+            informe = json.dumps(perfilador.informe(), indent=2)
+            if args.profile_salida:
+                with open(args.profile_salida, "w") as archivo:
+                    archivo.write(informe + "\n")
+            else:
+                print(informe, file=sys.stderr)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
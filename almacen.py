@@ -0,0 +1,122 @@
+# Almacén compacto de soluciones de CSPMaintenance
+#
+# Cada solución se guarda como una fila de enteros en un array; si el búfer supera el
+# presupuesto de memoria, las filas se vuelcan a un fichero temporal que se lee con mmap.
+
+import mmap
+import os
+import tempfile
+from array import array
+from collections.abc import Mapping
+
+from restricciones import TAREAS
+
+class VistaSolucion(Mapping):
+    # Solución de un AlmacenSoluciones: decodifica sus valores solo al consultarlos
+    def __init__(self, almacen, fila):
+        self._almacen = almacen
+        self._fila = fila
+        self._codigos = None
+
+    def __getitem__(self, variable):
+        indice = self._almacen.indice_variable[variable]
+        if self._codigos is None:
+            self._codigos = self._almacen.fila(self._fila)
+        return self._almacen.decodificar(self._codigos[indice], indice)
+
+    def __iter__(self):
+        return iter(self._almacen.variables)
+
+    def __len__(self):
+        return len(self._almacen.variables)
+
+class AlmacenSoluciones:
+    # Guarda cada solución como una fila de ancho fijo con un entero por variable
+    # (celda * 3 + índice de la tarea), en un array en memoria. Cuando el búfer supera
+    # presupuesto_bytes se vuelca a un fichero temporal que se lee con mmap.
+    # Las variables y el tipo de avión de cada una se fijan con la primera solución.
+    def __init__(self, filas, columnas, presupuesto_bytes=64 * 1024 * 1024, directorio=None):
+        self.columnas = columnas
+        codigos = filas * columnas * len(TAREAS)
+        self.tipo_codigo = "B" if codigos <= 0xFF else "H" if codigos <= 0xFFFF else "I"
+        self.presupuesto_bytes = presupuesto_bytes
+        self.directorio = directorio
+        self.variables = None
+        self.indice_variable = None
+        self.tipos = None
+        self._bufer = array(self.tipo_codigo)
+        self._archivo = None
+        self._mmap = None
+        self._filas_disco = 0
+        self._filas_mmap = 0
+
+    def __len__(self):
+        return self._filas_disco + (len(self._bufer) // len(self.variables) if self.variables else 0)
+
+    def __getitem__(self, fila):
+        if fila < 0:
+            fila += len(self)
+        if not 0 <= fila < len(self):
+            raise IndexError("índice de solución fuera de rango")
+        return VistaSolucion(self, fila)
+
+    def __iter__(self):
+        for fila in range(len(self)):
+            yield VistaSolucion(self, fila)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excinfo):
+        self.cerrar()
+
+    @property
+    def bytes_en_memoria(self):
+        return len(self._bufer) * self._bufer.itemsize
+
+    def agregar(self, solucion):
+        if self.variables is None:
+            self.variables = sorted(solucion)
+            self.indice_variable = {variable: idx for idx, variable in enumerate(self.variables)}
+            self.tipos = [solucion[variable]["tipo"] for variable in self.variables]
+        columnas = self.columnas
+        for variable in self.variables:
+            valor = solucion[variable]
+            x, y = valor["posicion"]
+            self._bufer.append((x * columnas + y) * 3 + TAREAS.index(valor["tarea"]))
+        if self.presupuesto_bytes is not None and self.bytes_en_memoria > self.presupuesto_bytes:
+            self._volcar()
+
+    def _volcar(self):
+        if self._archivo is None:
+            self._archivo = tempfile.TemporaryFile(dir=self.directorio)
+        self._archivo.seek(0, os.SEEK_END)
+        self._bufer.tofile(self._archivo)
+        self._archivo.flush()
+        self._filas_disco += len(self._bufer) // len(self.variables)
+        del self._bufer[:]
+
+    def fila(self, fila):
+        ancho = len(self.variables)
+        if fila >= self._filas_disco:
+            inicio = (fila - self._filas_disco) * ancho
+            return self._bufer[inicio:inicio + ancho]
+        if self._filas_mmap != self._filas_disco:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+            self._filas_mmap = self._filas_disco
+        tamano = ancho * self._bufer.itemsize
+        return array(self.tipo_codigo, self._mmap[fila * tamano:(fila + 1) * tamano])
+
+    def decodificar(self, codigo, indice):
+        celda, tarea = divmod(codigo, 3)
+        return {"posicion": divmod(celda, self.columnas), "tarea": TAREAS[tarea], "tipo": self.tipos[indice]}
+
+    def cerrar(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
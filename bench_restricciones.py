@@ -0,0 +1,100 @@
+# Micro-benchmark de las restricciones por franja de CSPMaintenance
+#
+# Compara las funciones originales (restriccion_capacidad y restriccion_adyacentes, que
+# construyen diccionarios y listas en cada llamada) con RestriccionFranja, que evalúa
+# sobre contadores precalculados. Se miden llamadas por segundo en dos escenarios:
+# - completa: cada llamada recibe una asignación completa nueva de la franja
+# - incremental: cada llamada cambia la posición de un solo avión, como en la búsqueda
+
+import random
+import sys
+import time
+
+from CSPMaintenance import leer_entrada, crear_mapa
+from restricciones import RestriccionFranja
+from rutas import adyacentes_validos
+
+def restricciones_originales(filas, columnas):
+    def restriccion_capacidad(*valores):
+        posiciones = {}
+        for valor in valores:
+            pos = valor["posicion"]
+            tipo = valor["tipo"]
+            if pos not in posiciones:
+                posiciones[pos] = {"jumbos": 0, "estandar": 0}
+            if tipo == "JMB":
+                posiciones[pos]["jumbos"] += 1
+            else:
+                posiciones[pos]["estandar"] += 1
+            if posiciones[pos]["jumbos"] > 1:
+                return False
+            if posiciones[pos]["jumbos"] > 0 and posiciones[pos]["estandar"] > 1:
+                return False
+            if posiciones[pos]["estandar"] > 2:
+                return False
+        return True
+
+    def restriccion_adyacentes(*valores):
+        posiciones = [v["posicion"] for v in valores]
+        for i, valor in enumerate(valores):
+            pos = valor["posicion"]
+            tipo = valor["tipo"]
+            adyacentes = adyacentes_validos(pos, filas, columnas)
+            if all(adj in posiciones for adj in adyacentes):
+                return False
+            if tipo == "JMB":
+                for j, otro_valor in enumerate(valores):
+                    if i != j and otro_valor["tipo"] == "JMB" and otro_valor["posicion"] in adyacentes:
+                        return False
+        return True
+
+    def evaluar(variables, asignacion):
+        valores = [asignacion[v] for v in variables]
+        return restriccion_capacidad(*valores) and restriccion_adyacentes(*valores)
+
+    return evaluar
+
+def generar_asignaciones(aviones, celdas, variables, escenario, n, rng):
+    asignacion = {v: {"posicion": rng.choice(celdas), "tarea": "T1", "tipo": a["tipo"]} for v, a in zip(variables, aviones)}
+    asignaciones = []
+    for _ in range(n):
+        if escenario == "completa":
+            asignacion = {v: {"posicion": rng.choice(celdas), "tarea": "T1", "tipo": a["tipo"]} for v, a in zip(variables, aviones)}
+        else:
+            asignacion = dict(asignacion)
+            idx = rng.randrange(len(variables))
+            asignacion[variables[idx]] = {"posicion": rng.choice(celdas), "tarea": "T1", "tipo": aviones[idx]["tipo"]}
+        asignaciones.append(asignacion)
+    return asignaciones
+
+def medir(evaluar, variables, asignaciones):
+    inicio = time.perf_counter()
+    for asignacion in asignaciones:
+        evaluar(variables, asignacion)
+    return len(asignaciones) / (time.perf_counter() - inicio)
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print("Uso: python bench_restricciones.py <ruta_archivo_entrada> [llamadas]")
+        sys.exit(1)
+
+    franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones = leer_entrada(sys.argv[1])
+    n = int(sys.argv[2]) if len(sys.argv) == 3 else 20000
+    mapa = crear_mapa(filas, columnas, talleres_std, talleres_spc, parkings)
+    celdas = mapa.posiciones("STD", "SPC", "PRK")
+    variables = [f"Avion_{avion['id']}_t0" for avion in aviones]
+
+    restriccion = RestriccionFranja(columnas, mapa.vecindad(), [avion["tipo"] == "JMB" for avion in aviones])
+    compilada = lambda variables, asignacion: restriccion(variables, None, asignacion)
+    original = restricciones_originales(filas, columnas)
+
+    rng = random.Random(0)
+    print(f"{len(aviones)} aviones, mapa {filas}x{columnas}, {n} llamadas")
+    for escenario in ("completa", "incremental"):
+        asignaciones = generar_asignaciones(aviones, celdas, variables, escenario, n, rng)
+        antes = medir(original, variables, asignaciones)
+        despues = medir(compilada, variables, asignaciones)
+        print(f"{escenario:>12}: antes {antes:12.0f} llamadas/s  después {despues:12.0f} llamadas/s  (x{despues / antes:.1f})")
+
+if __name__ == "__main__":
+    main()
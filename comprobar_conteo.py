@@ -0,0 +1,69 @@
+# Comprobación del conteo exacto de CSPMaintenance
+#
+# Genera instancias pequeñas al azar (mapas de hasta 3x3, hasta 3 franjas y 3 aviones,
+# descartando las que admitirían más de MAX_ASIGNACIONES asignaciones) y compara ContadorSoluciones con la enumeración completa de python-constraint:
+# contar() debe coincidir con el número de soluciones y solucion(i), para todo i, debe
+# recorrer exactamente esas soluciones.
+
+import random
+import sys
+
+from CSPMaintenance import crear_mapa, definir_modelo_csp, TablaAviones
+from conteo import ContadorSoluciones
+
+MAX_ASIGNACIONES = 200000
+
+def instancia_aleatoria(rng):
+    filas, columnas = rng.randint(1, 3), rng.randint(1, 3)
+    tipos = {"STD": [], "SPC": [], "PRK": []}
+    for x in range(filas):
+        for y in range(columnas):
+            tipo = rng.choice(["VACIO", "STD", "SPC", "PRK"])
+            if tipo != "VACIO":
+                tipos[tipo].append((x, y))
+    franjas_horarias = rng.randint(1, 3)
+    aviones = []
+    for id_avion in range(1, rng.randint(1, 3) + 1):
+        tareas_tipo_1 = rng.randint(0, franjas_horarias)
+        tareas_tipo_2 = rng.randint(0, franjas_horarias - tareas_tipo_1)
+        aviones.append({"id": id_avion, "tipo": rng.choice(["JMB", "STD"]), "restr": rng.random() < 0.5,
+                        "tareas_tipo_1": tareas_tipo_1, "tareas_tipo_2": tareas_tipo_2})
+    return franjas_horarias, filas, columnas, tipos["STD"], tipos["SPC"], tipos["PRK"], aviones
+
+def clave(solucion):
+    return frozenset((variable, valor["posicion"], valor["tarea"], valor["tipo"]) for variable, valor in solucion.items())
+
+def comprobar(franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones):
+    mapa = crear_mapa(filas, columnas, talleres_std, talleres_spc, parkings)
+    esperadas = {clave(solucion) for solucion in definir_modelo_csp(franjas_horarias, filas, columnas, talleres_std, talleres_spc, parkings, aviones, mapa).getSolutions()}
+    contador = ContadorSoluciones(franjas_horarias, filas, columnas, TablaAviones.desde_dicts(aviones), mapa)
+    total = contador.contar()
+    obtenidas = [clave(contador.solucion(indice)) for indice in range(total)]
+    return total == len(esperadas) and set(obtenidas) == esperadas and len(set(obtenidas)) == total, total, len(esperadas)
+
+def main():
+    if len(sys.argv) > 3:
+        print("Uso: python comprobar_conteo.py [instancias] [semilla]")
+        sys.exit(1)
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = random.Random(int(sys.argv[2]) if len(sys.argv) > 2 else 0)
+    fallos = 0
+    comprobadas = 0
+    while comprobadas < n:
+        instancia = instancia_aleatoria(rng)
+        celdas = len(instancia[3]) + len(instancia[4]) + len(instancia[5])
+        # definir_modelo_csp no admite dominios vacíos, y las instancias grandes tardan
+        # demasiado en enumerarse
+        if not celdas or celdas ** (instancia[0] * len(instancia[6])) > MAX_ASIGNACIONES:
+            continue
+        comprobadas += 1
+        correcto, total, esperado = comprobar(*instancia)
+        if not correcto:
+            fallos += 1
+            print(f"Discrepancia: contar() = {total}, python-constraint = {esperado} en {instancia}")
+    print(f"{n} instancias comprobadas, {fallos} discrepancias")
+    sys.exit(1 if fallos else 0)
+
+if __name__ == "__main__":
+    main()
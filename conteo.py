@@ -0,0 +1,255 @@
+# Conteo exacto, muestreo uniforme y paginación de las soluciones de CSPMaintenance
+#
+# ContadorSoluciones cuenta las soluciones del modelo franja a franja sin enumerarlas, lo
+# que permite obtener la solución i-ésima de un orden canónico y muestrear de forma uniforme.
+# IteradorSoluciones y pagina_soluciones recorren ese orden por páginas con cursores.
+
+import base64
+import hashlib
+import json
+import os
+import random
+from array import array
+from itertools import product
+
+from restricciones import TAREAS, tabla_tareas, RestriccionFranja
+
+class ContadorSoluciones:
+    # Cuenta las soluciones del modelo de definir_modelo_csp (sin max_rodaje) sin
+    # enumerarlas y permite obtener la solución i-ésima de un orden canónico. Los aviones se
+    # leen por columnas de una TablaAviones.
+    # Recorre las franjas con el estado (tareas_tipo_1, tareas_tipo_2) pendiente de cada
+    # avión: en cada franja elige un vector de tareas (una por avión, las que admite la
+    # TablaTareas del avión, la misma del modelo) y una colocación de los aviones compatible
+    # con RestriccionFranja.
+    # Las colocaciones de cada vector de tareas se enumeran una vez y se guardan como
+    # filas de celdas en un array; los recuentos por (franja, estado) se memorizan.
+    def __init__(self, franjas_horarias, filas, columnas, aviones, mapa):
+        self.franjas_horarias = franjas_horarias
+        self.columnas = columnas
+        self.aviones = aviones
+        self.mapa = mapa
+        self.celdas = {
+            "T2": mapa.posiciones("SPC"),
+            "T1": mapa.posiciones("STD", "SPC"),
+            "PRK": mapa.posiciones("PRK"),
+        }
+        self.tipo_celda = "H" if filas * columnas <= 0xFFFF else "I"
+        self.estado_inicial = tuple(zip(self.aviones.tareas_tipo_1, self.aviones.tareas_tipo_2))
+        self.tablas = [tabla_tareas(franjas_horarias, t1, t2, bool(restr)) for t1, t2, restr in zip(aviones.tareas_tipo_1, aviones.tareas_tipo_2, aviones.restr)]
+        self._colocaciones = {}
+        self._cuentas = {}
+        self._en_disco = {}
+        self._ruta_disco = None
+
+    def _tareas_posibles(self, franja, estado):
+        # Tareas que la TablaTareas de cada avión admite en esta franja desde su estado
+        opciones = []
+        for tabla, (t1, t2) in zip(self.tablas, estado):
+            actual = tabla.estado(t1, t2)
+            opciones.append([tarea for tarea in TAREAS if tabla.avanzar(actual, tarea) & tabla.validos[franja + 1]])
+        return product(*opciones)
+
+    @staticmethod
+    def _siguiente(estado, tareas):
+        return tuple((t1 - (tarea == "T1"), t2 - (tarea == "T2")) for (t1, t2), tarea in zip(estado, tareas))
+
+    def colocaciones(self, tareas):
+        # Colocaciones válidas de los aviones para un vector de tareas, como filas de
+        # len(aviones) celdas (x * columnas + y) en un array
+        if tareas not in self._colocaciones and tareas in self._en_disco:
+            inicio, longitud = self._en_disco[tareas]
+            filas = array(self.tipo_celda)
+            with open(self._ruta_disco, "rb") as archivo:
+                archivo.seek(inicio * filas.itemsize)
+                filas.fromfile(archivo, longitud)
+            self._colocaciones[tareas] = filas
+        if tareas not in self._colocaciones:
+            variables = [f"Avion_{id_avion}" for id_avion in self.aviones.ids]
+            restriccion = RestriccionFranja(self.columnas, self.mapa.vecindad(), self.aviones.es_jumbo())
+            opciones = [[{"posicion": pos} for pos in self.celdas[tarea]] for tarea in tareas]
+            filas = array(self.tipo_celda)
+            asignacion = {}
+
+            def colocar(indice):
+                if indice == len(variables):
+                    filas.extend(x * self.columnas + y for x, y in (asignacion[v]["posicion"] for v in variables))
+                    return
+                for valor in opciones[indice]:
+                    asignacion[variables[indice]] = valor
+                    if restriccion(variables, None, asignacion):
+                        colocar(indice + 1)
+                # Sin celdas para la tarea no se llega a asignar la variable
+                asignacion.pop(variables[indice], None)
+
+            if variables:
+                colocar(0)
+            self._colocaciones[tareas] = filas
+        return self._colocaciones[tareas]
+
+    def numero_colocaciones(self, tareas):
+        if not tareas:
+            return 1
+        if tareas in self._en_disco and tareas not in self._colocaciones:
+            return self._en_disco[tareas][1] // len(tareas)
+        return len(self.colocaciones(tareas)) // len(tareas)
+
+    def contar(self, franja=0, estado=None):
+        estado = self.estado_inicial if estado is None else estado
+        if not all(tabla.estado(t1, t2) & tabla.validos[franja] for tabla, (t1, t2) in zip(self.tablas, estado)):
+            return 0
+        if franja == self.franjas_horarias:
+            return 1
+        clave = (franja, estado)
+        if clave not in self._cuentas:
+            total = 0
+            for tareas in self._tareas_posibles(franja, estado):
+                colocaciones = self.numero_colocaciones(tareas)
+                if colocaciones:
+                    total += colocaciones * self.contar(franja + 1, self._siguiente(estado, tareas))
+            self._cuentas[clave] = total
+        return self._cuentas[clave]
+
+    def solucion(self, indice):
+        # Solución número indice (0 <= indice < contar()) del orden canónico, en el mismo
+        # formato que las de python-constraint
+        if not 0 <= indice < self.contar():
+            raise IndexError("índice de solución fuera de rango")
+        solucion = {}
+        estado = self.estado_inicial
+        for franja in range(self.franjas_horarias):
+            for tareas in self._tareas_posibles(franja, estado):
+                colocaciones = self.numero_colocaciones(tareas)
+                if not colocaciones:
+                    continue
+                siguiente = self._siguiente(estado, tareas)
+                por_colocacion = self.contar(franja + 1, siguiente)
+                if indice < colocaciones * por_colocacion:
+                    break
+                indice -= colocaciones * por_colocacion
+            fila, indice = divmod(indice, por_colocacion)
+            celdas = self.colocaciones(tareas)[fila * len(tareas):(fila + 1) * len(tareas)]
+            for indice_avion, (id_avion, tarea, celda) in enumerate(zip(self.aviones.ids, tareas, celdas)):
+                solucion[f"Avion_{id_avion}_t{franja}"] = {"posicion": divmod(celda, self.columnas), "tarea": tarea, "tipo": self.aviones.tipo(indice_avion)}
+            estado = siguiente
+        return solucion
+
+    def huella(self):
+        # Identifica el modelo (franjas, mapa y aviones) para validar cursores
+        aviones = self.aviones
+        datos = json.dumps([self.franjas_horarias, self.mapa.filas, self.columnas, list(aviones.ids), aviones.tipos.hex(),
+                            aviones.restr.hex(), list(aviones.tareas_tipo_1), list(aviones.tareas_tipo_2)]).encode()
+        return hashlib.sha256(datos + bytes(self.mapa.celdas)).hexdigest()[:16]
+
+    # Los recuentos y las colocaciones se pueden guardar en directorio (un .json y un .bin
+    # por huella del modelo) para que otro proceso, p. ej. la siguiente petición de una
+    # paginación por cursor, no tenga que volver a contar. cargar devuelve False si no hay
+    # nada guardado para este modelo.
+    def guardar(self, directorio):
+        self.contar()
+        base = os.path.join(directorio, f"conteo-{self.huella()}")
+        os.makedirs(directorio, exist_ok=True)
+        indice = []
+        inicio = 0
+        with open(base + ".bin.tmp", "wb") as archivo:
+            for tareas in self._en_disco.keys() | self._colocaciones.keys():
+                filas = self.colocaciones(tareas)
+                filas.tofile(archivo)
+                indice.append([list(tareas), inicio, len(filas)])
+                inicio += len(filas)
+        datos = {
+            "tipo_celda": self.tipo_celda,
+            "cuentas": [[franja, [list(tareas) for tareas in estado], total] for (franja, estado), total in self._cuentas.items()],
+            "colocaciones": indice,
+        }
+        with open(base + ".json.tmp", "w") as archivo:
+            json.dump(datos, archivo)
+        os.replace(base + ".bin.tmp", base + ".bin")
+        os.replace(base + ".json.tmp", base + ".json")
+
+    def cargar(self, directorio):
+        base = os.path.join(directorio, f"conteo-{self.huella()}")
+        try:
+            with open(base + ".json") as archivo:
+                datos = json.load(archivo)
+        except FileNotFoundError:
+            return False
+        if datos["tipo_celda"] != self.tipo_celda:
+            return False
+        self._cuentas = {(franja, tuple(tuple(tareas) for tareas in estado)): total for franja, estado, total in datos["cuentas"]}
+        self._en_disco = {tuple(tareas): (inicio, longitud) for tareas, inicio, longitud in datos["colocaciones"]}
+        self._colocaciones = {}
+        self._ruta_disco = base + ".bin"
+        return True
+
+    def muestrear(self, k, semilla=None):
+        # k soluciones tomadas de forma uniforme (con reemplazo), como (índice, solución)
+        rng = random.Random(semilla)
+        total = self.contar()
+        for _ in range(k if total else 0):
+            indice = rng.randrange(total)
+            yield indice, self.solucion(indice)
+
+class IteradorSoluciones:
+    # Recorre perezosamente las soluciones de un ContadorSoluciones en su orden canónico.
+    # skip(n) avanza sin enumerar las soluciones saltadas y cursor() devuelve un texto que,
+    # con desde_cursor, continúa en la misma posición en otra petición o proceso.
+    # El cursor solo guarda la posición: para no recontar en cada petición hay que reutilizar
+    # el mismo contador (proceso de larga duración) o sus recuentos guardados (guardar/cargar).
+    def __init__(self, contador, posicion=0):
+        self.contador = contador
+        self.posicion = posicion
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.posicion >= self.contador.contar():
+            raise StopIteration
+        solucion = self.contador.solucion(self.posicion)
+        self.posicion += 1
+        return solucion
+
+    def skip(self, n):
+        # Sin recortar al total: pasado el final, el iterador queda agotado y la posición
+        # sigue indicando el desplazamiento pedido
+        self.posicion += n
+        return self
+
+    def pagina(self, tamano):
+        return [solucion for _, solucion in zip(range(tamano), self)]
+
+    def cursor(self):
+        datos = json.dumps({"posicion": self.posicion, "huella": self.contador.huella()})
+        return base64.urlsafe_b64encode(datos.encode()).decode()
+
+    @classmethod
+    def desde_cursor(cls, contador, cursor):
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            posicion, huella = int(datos["posicion"]), datos["huella"]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("cursor no válido")
+        if huella != contador.huella():
+            raise ValueError("el cursor corresponde a otro modelo")
+        if not 0 <= posicion <= contador.contar():
+            raise ValueError("cursor fuera de rango")
+        return cls(contador, posicion)
+
+# Página de soluciones a partir de un desplazamiento o de un cursor previo. Devuelve las
+# soluciones y el cursor de la página siguiente (None si no quedan más).
+def pagina_soluciones(contador, tamano, desde=0, cursor=None):
+    iterador = IteradorSoluciones.desde_cursor(contador, cursor) if cursor else IteradorSoluciones(contador)
+    iterador.skip(desde)
+    inicio = iterador.posicion
+    soluciones = iterador.pagina(tamano)
+    siguiente = iterador.cursor() if iterador.posicion < contador.contar() else None
+    return inicio, soluciones, siguiente
+
+# ContadorSoluciones que, con directorio, reutiliza los recuentos guardados por una
+# ejecución anterior sobre el mismo modelo o guarda los suyos para la siguiente
+def contador_soluciones(franjas_horarias, filas, columnas, aviones, mapa, directorio=None):
+    contador = ContadorSoluciones(franjas_horarias, filas, columnas, aviones, mapa)
+    if directorio and not contador.cargar(directorio):
+        contador.guardar(directorio)
+    return contador
@@ -0,0 +1,162 @@
+# Portafolio de búsquedas para los modelos de CSPMaintenance
+#
+# BacktrackingConfigurable es el backtracking de python-constraint con el orden de variables
+# y de valores configurable. resolver_portafolio lanza varias configuraciones en paralelo,
+# una por proceso, y se queda con la primera que termina.
+
+import multiprocessing
+import queue
+import random
+import sys
+import time
+
+from constraint import BacktrackingSolver
+
+class BacktrackingConfigurable(BacktrackingSolver):
+    # Backtracking con forward checking como BacktrackingSolver, pero con el orden de
+    # variables y de valores configurable:
+    # - orden_variables: "grado_mrv" (el de python-constraint), "mrv" (dominio más pequeño,
+    #   empates al azar) o "franja" (cronológico, avión a avión)
+    # - orden_valores: "dominio", "inverso" o "aleatorio"
+    def __init__(self, orden_variables="grado_mrv", orden_valores="dominio", semilla=None, forwardcheck=True):
+        super().__init__(forwardcheck)
+        self.orden_variables = orden_variables
+        self.orden_valores = orden_valores
+        self.semilla = semilla
+
+    def getSolutionIter(self, domains, constraints, vconstraints):
+        rng = random.Random(self.semilla)
+        for variable in sorted(domains):
+            if self.orden_valores == "aleatorio":
+                rng.shuffle(domains[variable])
+            elif self.orden_valores == "inverso":
+                domains[variable].reverse()
+
+        if self.orden_variables == "franja":
+            orden = sorted(domains, key=lambda v: (int(v.split("_")[2][1:]), int(v.split("_")[1])))
+        elif self.orden_variables == "mrv":
+            orden = sorted(domains)
+            rng.shuffle(orden)
+        else:
+            orden = sorted(domains)
+        rango = {variable: idx for idx, variable in enumerate(orden)}
+        if self.orden_variables == "franja":
+            clave = rango.__getitem__
+        elif self.orden_variables == "mrv":
+            clave = lambda v: (len(domains[v]), rango[v])
+        else:
+            clave = lambda v: (-len(vconstraints[v]), len(domains[v]), rango[v])
+
+        forwardcheck = self._forwardcheck
+        assignments = {}
+        queue = []
+        while True:
+            pendientes = [v for v in domains if v not in assignments]
+            if pendientes:
+                variable = min(pendientes, key=clave)
+                values = domains[variable][:]
+                pushdomains = [domains[x] for x in pendientes if x != variable] if forwardcheck else None
+            else:
+                # Solución completa: volver a la última variable, si la hay
+                yield assignments.copy()
+                if not queue:
+                    return
+                variable, values, pushdomains = queue.pop()
+                if pushdomains:
+                    for domain in pushdomains:
+                        domain.popState()
+
+            while True:
+                if not values:
+                    # Sin valores: volver a la última variable con valores, si la hay
+                    del assignments[variable]
+                    while queue:
+                        variable, values, pushdomains = queue.pop()
+                        if pushdomains:
+                            for domain in pushdomains:
+                                domain.popState()
+                        if values:
+                            break
+                        del assignments[variable]
+                    else:
+                        return
+
+                assignments[variable] = values.pop()
+                if pushdomains:
+                    for domain in pushdomains:
+                        domain.pushState()
+                for constraint, variables in vconstraints[variable]:
+                    if not constraint(variables, domains, assignments, pushdomains):
+                        break
+                else:
+                    break
+                if pushdomains:
+                    for domain in pushdomains:
+                        domain.popState()
+
+            queue.append((variable, values, pushdomains))
+
+# Configuraciones del portafolio: la búsqueda por defecto, variantes deterministas y,
+# a partir de ahí, búsquedas con órdenes aleatorios y semillas distintas
+def configuraciones_portafolio(n):
+    configuraciones = [
+        {"orden_variables": "grado_mrv", "orden_valores": "dominio", "semilla": None},
+        {"orden_variables": "franja", "orden_valores": "dominio", "semilla": None},
+        {"orden_variables": "grado_mrv", "orden_valores": "inverso", "semilla": None},
+    ]
+    semilla = 0
+    while len(configuraciones) < n:
+        semilla += 1
+        orden_variables = "mrv" if semilla % 2 else "grado_mrv"
+        configuraciones.append({"orden_variables": orden_variables, "orden_valores": "aleatorio", "semilla": semilla})
+    return configuraciones[:n]
+
+def _busqueda_portafolio(indice, configuracion, definir_modelo, argumentos_modelo, resultados):
+    inicio = time.perf_counter()
+    try:
+        problem = definir_modelo(*argumentos_modelo)
+        problem.setSolver(BacktrackingConfigurable(**configuracion))
+        resultados.put((indice, problem.getSolution(), time.perf_counter() - inicio, None))
+    except Exception as error:
+        resultados.put((indice, None, time.perf_counter() - inicio, repr(error)))
+
+# Lanza una búsqueda por configuración en procesos separados sobre el mismo modelo,
+# construido en cada proceso con definir_modelo(*argumentos_modelo). La primera en terminar (con solución o demostrando que no la hay)
+# gana y las demás se cancelan. Un proceso que muere sin dar resultado (señal, falta de
+# memoria) cuenta como búsqueda fallida. Devuelve (configuración ganadora, solución o None,
+# segundos, búsquedas canceladas); la configuración es None si todas las búsquedas fallaron.
+def resolver_portafolio(configuraciones, definir_modelo, argumentos_modelo, espera=0.1):
+    resultados = multiprocessing.Queue()
+    procesos = [multiprocessing.Process(target=_busqueda_portafolio, args=(indice, configuracion, definir_modelo, argumentos_modelo, resultados), daemon=True)
+                for indice, configuracion in enumerate(configuraciones)]
+    for proceso in procesos:
+        proceso.start()
+    pendientes = set(range(len(procesos)))
+    ganadora = None, None, None
+    try:
+        while pendientes:
+            try:
+                indice, solucion, segundos, error = resultados.get(timeout=espera)
+            except queue.Empty:
+                # Los procesos que terminan bien ya han dejado su resultado en la cola
+                for indice in sorted(pendientes):
+                    codigo = procesos[indice].exitcode
+                    if codigo is not None and codigo != 0:
+                        pendientes.discard(indice)
+                        print(f"La búsqueda {configuraciones[indice]} terminó sin resultado (código {codigo})", file=sys.stderr)
+                continue
+            pendientes.discard(indice)
+            if error is None:
+                ganadora = configuraciones[indice], solucion, segundos
+                break
+            print(f"La búsqueda {configuraciones[indice]} falló: {error}", file=sys.stderr)
+    finally:
+        # Solo cuentan como canceladas las búsquedas que aún no habían dado resultado
+        canceladas = 0
+        for indice, proceso in enumerate(procesos):
+            if proceso.is_alive():
+                proceso.terminate()
+                canceladas += indice in pendientes
+        for proceso in procesos:
+            proceso.join()
+    return (*ganadora, canceladas)
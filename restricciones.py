@@ -0,0 +1,261 @@
+# Restricciones compiladas del modelo de CSPMaintenance
+#
+# RestriccionTablaTareas limita la secuencia de tareas de cada avión a sus líneas temporales
+# (TablaTareas), RestriccionFranja comprueba la capacidad y la maniobrabilidad de una franja
+# con contadores de ocupación que se actualizan de forma incremental y RestriccionRodaje
+# limita el rodaje de todos los aviones entre dos franjas consecutivas.
+
+from array import array
+from functools import lru_cache
+
+from constraint import Constraint, Unassigned
+
+from rutas import alcance_rodaje
+
+TAREAS = ("T2", "T1", "PRK")
+
+# Líneas temporales de tareas de un avión: secuencias de "T2", "T1" y "PRK" con
+# exactamente tareas_tipo_2 T2 y tareas_tipo_1 T1. Con restr, no se hace ninguna T1
+# mientras queden T2 pendientes. Si tras estas franjas quedan franjas_posteriores
+# (horizonte rodante), basta con que las tareas que no se hagan quepan en ellas.
+# En lugar de enumerar las líneas, la tabla guarda por capas los estados por los que pasan:
+# tras cada franja, las tareas (t1, t2) que quedan, codificadas como t1 * (tareas_tipo_2 + 1)
+# + t2. Un conjunto de estados es una máscara de bits; la tabla ocupa O(franjas * t1 * t2).
+class TablaTareas:
+    def __init__(self, franjas_horarias, tareas_tipo_1, tareas_tipo_2, restr, franjas_posteriores=0):
+        self.franjas_horarias = franjas_horarias
+        self.salto_t1 = tareas_tipo_2 + 1
+        self.con_t2 = 0
+        self.con_t1 = 0
+        caben = [0] * (franjas_horarias + 1)
+        for t1 in range(tareas_tipo_1 + 1):
+            for t2 in range(tareas_tipo_2 + 1):
+                bit = 1 << (t1 * self.salto_t1 + t2)
+                if t2 > 0:
+                    self.con_t2 |= bit
+                if t1 > 0 and not (restr and t2 > 0):
+                    self.con_t1 |= bit
+                for franja in range(franjas_horarias + 1):
+                    if t1 + t2 <= franjas_horarias - franja + franjas_posteriores:
+                        caben[franja] |= bit
+
+        # Estados alcanzables desde el inicial que aún pueden completar la línea
+        alcanzables = [caben[0] & self.estado(tareas_tipo_1, tareas_tipo_2)]
+        for franja in range(franjas_horarias):
+            alcanzables.append(self.sucesores(alcanzables[franja]) & caben[franja + 1])
+        validos = alcanzables[:]
+        for franja in reversed(range(franjas_horarias)):
+            validos[franja] &= self.predecesores(validos[franja + 1])
+        self.validos = tuple(validos)
+
+    def estado(self, tareas_tipo_1, tareas_tipo_2):
+        # Máscara con el único estado de las tareas que quedan
+        return 1 << (tareas_tipo_1 * self.salto_t1 + tareas_tipo_2)
+
+    def avanzar(self, estados, tarea):
+        if tarea == "T2":
+            return (estados & self.con_t2) >> 1
+        if tarea == "T1":
+            return (estados & self.con_t1) >> self.salto_t1
+        return estados
+
+    def retroceder(self, estados, tarea):
+        if tarea == "T2":
+            return (estados << 1) & self.con_t2
+        if tarea == "T1":
+            return (estados << self.salto_t1) & self.con_t1
+        return estados
+
+    def sucesores(self, estados):
+        return self.avanzar(estados, "T2") | self.avanzar(estados, "T1") | estados
+
+    def predecesores(self, estados):
+        return self.retroceder(estados, "T2") | self.retroceder(estados, "T1") | estados
+
+    def admite(self, franja, tarea):
+        return bool(self.avanzar(self.validos[franja], tarea) & self.validos[franja + 1])
+
+# Se comparte entre aviones con la misma carga. La caché está acotada porque el horizonte
+# rodante pide tablas nuevas en cada ventana (otras franjas_posteriores y tareas pendientes).
+@lru_cache(maxsize=256)
+def tabla_tareas(franjas_horarias, tareas_tipo_1, tareas_tipo_2, restr, franjas_posteriores=0):
+    return TablaTareas(franjas_horarias, tareas_tipo_1, tareas_tipo_2, restr, franjas_posteriores)
+
+class RestriccionTablaTareas(Constraint):
+    # Restricción de tabla sobre las variables de un avión (una por franja, en orden):
+    # recorre la TablaTareas hacia delante con las tareas asignadas y, con forward checking,
+    # hacia atrás para podar los valores cuya tarea ya no está en ninguna línea compatible.
+    def __init__(self, tabla):
+        self._tabla = tabla
+
+    def preProcess(self, variables, domains, constraints, vconstraints):
+        for franja, variable in enumerate(variables):
+            domain = domains[variable]
+            for valor in domain[:]:
+                if not self._tabla.admite(franja, valor["tarea"]):
+                    domain.remove(valor)
+
+    def __call__(self, variables, domains, assignments, forwardcheck=False, _unassigned=Unassigned):
+        tabla = self._tabla
+        validos = tabla.validos
+        delante = [validos[0]]
+        tareas = []
+        for franja, variable in enumerate(variables):
+            valor = assignments.get(variable, _unassigned)
+            if valor is _unassigned:
+                tareas.append(None)
+                estados = tabla.sucesores(delante[franja])
+            else:
+                tareas.append(valor["tarea"])
+                estados = tabla.avanzar(delante[franja], valor["tarea"])
+            estados &= validos[franja + 1]
+            if not estados:
+                return False
+            delante.append(estados)
+
+        if forwardcheck:
+            detras = delante[-1]
+            for franja in reversed(range(len(variables))):
+                tarea = tareas[franja]
+                if tarea is not None:
+                    detras = tabla.retroceder(detras, tarea) & delante[franja]
+                    continue
+                sin_soporte = [tarea for tarea in TAREAS if not tabla.avanzar(delante[franja], tarea) & detras]
+                if sin_soporte:
+                    domain = domains[variables[franja]]
+                    for valor in domain[:]:
+                        if valor["tarea"] in sin_soporte:
+                            domain.hideValue(valor)
+                    if not domain:
+                        return False
+                detras = tabla.predecesores(detras) & delante[franja]
+        return True
+
+class RestriccionFranja(Constraint):
+    # Reglas de una franja compiladas al construir el modelo:
+    # - No permitir JMB+JMB, ni JMB con más de un estándar, y limitar a 2 aviones estándar
+    # - Un adyacente debe estar vacío y no puede haber JMB en adyacentes
+    # Mantiene contadores de ocupación por celda útil (según Mapa.vecindad) que se
+    # actualizan (y deshacen) solo para las variables que cambian entre llamadas, junto con
+    # el número de conflictos vigentes, por lo que también poda asignaciones parciales.
+    def __init__(self, columnas, vecindad, es_jumbo):
+        self._columnas = columnas
+        self._compacto, self._vecinos, self._grados = vecindad
+        celdas = len(self._vecinos)
+        self._es_jumbo = es_jumbo
+        self._jumbos = array("i", bytes(4 * celdas))
+        self._estandar = array("i", bytes(4 * celdas))
+        self._vecinas_ocupadas = array("i", bytes(4 * celdas))
+        self._jumbos_vecinos = array("i", bytes(4 * celdas))
+        self._celda_de = [-1] * len(es_jumbo)
+        self._conflictos = 0
+
+    def _conflictos_celda(self, celda):
+        jumbos = self._jumbos[celda]
+        estandar = self._estandar[celda]
+        if not jumbos and not estandar:
+            return 0
+        conflictos = jumbos * self._jumbos_vecinos[celda]
+        if jumbos > 1 or (jumbos and estandar > 1) or estandar > 2:
+            conflictos += 1
+        if self._vecinas_ocupadas[celda] == self._grados[celda]:
+            conflictos += 1
+        return conflictos
+
+    def _mover(self, indice, celda, signo):
+        vecinos = self._vecinos[celda]
+        conflictos = self._conflictos_celda(celda)
+        for vecina in vecinos:
+            conflictos += self._conflictos_celda(vecina)
+        self._conflictos -= conflictos
+
+        ocupada = self._jumbos[celda] + self._estandar[celda] > 0
+        if self._es_jumbo[indice]:
+            self._jumbos[celda] += signo
+            for vecina in vecinos:
+                self._jumbos_vecinos[vecina] += signo
+        else:
+            self._estandar[celda] += signo
+        if ocupada != (self._jumbos[celda] + self._estandar[celda] > 0):
+            for vecina in vecinos:
+                self._vecinas_ocupadas[vecina] += signo
+
+        conflictos = self._conflictos_celda(celda)
+        for vecina in vecinos:
+            conflictos += self._conflictos_celda(vecina)
+        self._conflictos += conflictos
+
+    def _asignar(self, indice, celda):
+        anterior = self._celda_de[indice]
+        if anterior == celda:
+            return
+        if anterior >= 0:
+            self._mover(indice, anterior, -1)
+        if celda >= 0:
+            self._mover(indice, celda, 1)
+        self._celda_de[indice] = celda
+
+    def __call__(self, variables, domains, assignments, forwardcheck=False, _unassigned=Unassigned):
+        columnas = self._columnas
+        compacto = self._compacto
+        pendiente = None
+        for indice, variable in enumerate(variables):
+            valor = assignments.get(variable, _unassigned)
+            if valor is _unassigned:
+                pendiente = indice if pendiente is None else -1
+                self._asignar(indice, -1)
+            else:
+                x, y = valor["posicion"]
+                self._asignar(indice, compacto[x * columnas + y])
+        if self._conflictos:
+            return False
+
+        # Forward checking cuando solo falta un avión en la franja
+        if forwardcheck and pendiente is not None and pendiente >= 0:
+            domain = domains[variables[pendiente]]
+            for valor in domain[:]:
+                x, y = valor["posicion"]
+                self._asignar(pendiente, compacto[x * columnas + y])
+                if self._conflictos:
+                    domain.hideValue(valor)
+            self._asignar(pendiente, -1)
+            if not domain:
+                return False
+        return True
+
+class RestriccionRodaje(Constraint):
+    # Rodaje entre dos franjas consecutivas: variables son las de todos los aviones en la
+    # franja de salida seguidas de las mismas en la siguiente. Cuando la franja de salida
+    # está asignada, sus posiciones forman los obstáculos (los mismos para todos los aviones,
+    # porque la celda de origen no estorba a quien sale de ella) y cada avión debe llegar a
+    # su destino en como mucho max_rodaje pasos. Con forward checking oculta los destinos
+    # fuera de alcance de los aviones que faltan en la franja siguiente.
+    def __init__(self, filas, columnas, max_rodaje):
+        self._filas = filas
+        self._columnas = columnas
+        self._max_rodaje = max_rodaje
+
+    def __call__(self, variables, domains, assignments, forwardcheck=False, _unassigned=Unassigned):
+        aviones = len(variables) // 2
+        origenes = []
+        for variable in variables[:aviones]:
+            valor = assignments.get(variable, _unassigned)
+            if valor is _unassigned:
+                return True
+            origenes.append(valor["posicion"])
+
+        obstaculos = frozenset(origenes)
+        for origen, variable in zip(origenes, variables[aviones:]):
+            alcance = alcance_rodaje(origen, self._filas, self._columnas, obstaculos, self._max_rodaje)
+            valor = assignments.get(variable, _unassigned)
+            if valor is not _unassigned:
+                if valor["posicion"] not in alcance:
+                    return False
+            elif forwardcheck:
+                domain = domains[variable]
+                for valor in domain[:]:
+                    if valor["posicion"] not in alcance:
+                        domain.hideValue(valor)
+                if not domain:
+                    return False
+        return True
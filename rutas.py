@@ -0,0 +1,103 @@
+# Rutas de rodaje sobre el mapa del aeropuerto de CSPMaintenance
+#
+# Los aviones ruedan entre celdas adyacentes (arriba, abajo, izquierda, derecha) y cada
+# paso cuesta 1. Las celdas ocupadas que se indiquen como obstáculos no se pueden atravesar,
+# pero sí pueden ser el destino: cuántos aviones caben en una celda lo decide el modelo.
+# Al pasar de una franja a la siguiente, los obstáculos de un avión son las posiciones que
+# ocupan los demás en la franja de la que sale (alcance_rodaje y coste_rodaje).
+
+import heapq
+from collections import deque
+from functools import lru_cache
+
+INALCANZABLE = -1
+
+def adyacentes_validos(pos, filas, columnas):
+    x, y = pos
+    adyacentes = [(x-1, y), (x+1, y), (x, y-1), (x, y+1)]
+    return [(nx, ny) for nx, ny in adyacentes if 0 <= nx < filas and 0 <= ny < columnas]
+
+def distancias_desde(origen, filas, columnas, obstaculos=frozenset(), limite=None):
+    # BFS desde origen: distancia a cada celda alcanzable (a como mucho limite pasos, si se
+    # da) como diccionario. Los obstáculos reciben distancia pero no se expanden, así que la
+    # búsqueda solo visita las celdas del entorno del origen y no todo el mapa.
+    distancias = {origen: 0}
+    pendientes = deque([origen])
+    while pendientes:
+        celda = pendientes.popleft()
+        siguiente = distancias[celda] + 1
+        if limite is not None and siguiente > limite:
+            continue
+        for vecina in adyacentes_validos(celda, filas, columnas):
+            if vecina not in distancias:
+                distancias[vecina] = siguiente
+                if vecina not in obstaculos:
+                    pendientes.append(vecina)
+    return distancias
+
+def ruta_a_estrella(origen, destino, filas, columnas, obstaculos=frozenset(), limite=None):
+    # Camino más corto de origen a destino (ambos incluidos) con A* y distancia Manhattan
+    # como heurística. Devuelve None si no hay ruta (de longitud como mucho limite, si se da).
+    def heuristica(celda):
+        return abs(celda[0] - destino[0]) + abs(celda[1] - destino[1])
+
+    abiertos = [(heuristica(origen), 0, origen)]
+    coste = {origen: 0}
+    previa = {origen: None}
+    while abiertos:
+        _, g, celda = heapq.heappop(abiertos)
+        if celda == destino:
+            ruta = []
+            while celda is not None:
+                ruta.append(celda)
+                celda = previa[celda]
+            return ruta[::-1]
+        if g > coste[celda]:
+            continue
+        for vecina in adyacentes_validos(celda, filas, columnas):
+            if vecina in obstaculos and vecina != destino:
+                continue
+            if limite is not None and g + 1 + heuristica(vecina) > limite:
+                continue
+            if g + 1 < coste.get(vecina, float("inf")):
+                coste[vecina] = g + 1
+                previa[vecina] = celda
+                heapq.heappush(abiertos, (g + 1 + heuristica(vecina), g + 1, vecina))
+    return None
+
+def distancia_manhattan(origen, destino):
+    # Cota inferior de la distancia de rodaje, sea cual sea la ocupación
+    return abs(origen[0] - destino[0]) + abs(origen[1] - destino[1])
+
+# Acotada porque la clave incluye los obstáculos, que cambian con cada asignación de una franja
+@lru_cache(maxsize=4096)
+def alcance_rodaje(origen, filas, columnas, obstaculos, limite):
+    # Celdas a las que se puede rodar desde origen en como mucho limite pasos, con su distancia
+    return distancias_desde(origen, filas, columnas, obstaculos, limite)
+
+@lru_cache(maxsize=4096)
+def distancia_rodaje(origen, destino, filas, columnas, obstaculos=frozenset(), limite=None):
+    # Longitud de la ruta de ruta_a_estrella, o INALCANZABLE
+    ruta = ruta_a_estrella(origen, destino, filas, columnas, obstaculos, limite)
+    return INALCANZABLE if ruta is None else len(ruta) - 1
+
+def coste_rodaje(solucion, filas, columnas):
+    # Suma de las distancias recorridas por cada avión entre franjas consecutivas, sin
+    # atravesar las posiciones de los demás aviones en la franja de salida.
+    # Devuelve None si algún movimiento no tiene ruta.
+    por_franja = {}
+    for variable, valor in solucion.items():
+        _, id_avion, franja = variable.split("_")
+        por_franja.setdefault(int(franja[1:]), {})[id_avion] = valor["posicion"]
+    coste = 0
+    for franja in sorted(por_franja):
+        if franja + 1 not in por_franja:
+            continue
+        actuales, siguientes = por_franja[franja], por_franja[franja + 1]
+        for id_avion, origen in actuales.items():
+            obstaculos = frozenset(pos for otro, pos in actuales.items() if otro != id_avion)
+            distancia = distancia_rodaje(origen, siguientes[id_avion], filas, columnas, obstaculos)
+            if distancia == INALCANZABLE:
+                return None
+            coste += distancia
+    return coste